@@ -24,3 +24,8 @@ APPS = {
 AZURE_SPEECH_KEY = "YOUR_KEY_HERE"
 AZURE_SERVICE_REGION = "eastus"  # e.g., "eastus", "westus", "centralindia"
 USE_AZURE_SPEECH = False # Set to True once you have entered your keys
+
+# Debug Endpoints
+# Exposes /debug/* routes for CPU profiling, memory snapshots and thread state.
+# Leave disabled unless you are diagnosing a slowdown; the API listens on all interfaces.
+ENABLE_DEBUG_ENDPOINTS = False
@@ -2,10 +2,10 @@ import datetime
 import re
 import threading
 import asyncio
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 import uvicorn
 import webbrowser
 import os
@@ -14,6 +14,8 @@ from voice_engine import speak, start_listening, command_queue
 from app_control import open_app, close_app_by_name, maximize_window, minimize_window, restore_window
 from system_control import set_volume_percentage, set_brightness, control_media
 from web_interaction import search_web
+from config import ENABLE_DEBUG_ENDPOINTS
+import profiler
 
 # --- API Setup ---
 app = FastAPI()
@@ -69,6 +71,72 @@ async def notify_ui(event_type, data):
         except:
             pass
 
+# --- Debug Endpoints (disabled unless ENABLE_DEBUG_ENDPOINTS is set) ---
+if ENABLE_DEBUG_ENDPOINTS:
+    # Handlers that may block are plain functions so FastAPI runs them in its
+    # threadpool instead of stalling the event loop that serves /ws.
+    @app.post("/debug/profile/start")
+    def start_profile(interval: float = 0.005, mode: str = "cpu"):
+        """Start sampling stacks of all threads, weighted by CPU time ("cpu") or per tick ("wall")"""
+        try:
+            started = profiler.start_cpu_profile(interval, mode)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not started:
+            return {"status": "already running"}
+        return {"status": "started", "interval": interval, "mode": mode}
+
+    @app.post("/debug/profile/stop")
+    def stop_profile():
+        """Stop sampling and return the profile as collapsed stacks for flame graphs"""
+        folded = profiler.stop_cpu_profile()
+        if folded is None:
+            return {"status": "not running"}
+        return PlainTextResponse(folded)
+
+    @app.get("/debug/profile")
+    async def get_profile_status():
+        """Endpoint to check whether a CPU profile is being recorded"""
+        return profiler.cpu_profile_status()
+
+    @app.post("/debug/memory/start")
+    def start_memory(frames: int = 1):
+        """Start tracing memory allocations with tracemalloc"""
+        try:
+            started = profiler.start_memory_tracing(frames)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not started:
+            return {"status": "already running"}
+        return {"status": "started"}
+
+    @app.post("/debug/memory/stop")
+    def stop_memory():
+        """Stop tracing memory allocations"""
+        if not profiler.stop_memory_tracing():
+            return {"status": "not running"}
+        return {"status": "stopped"}
+
+    @app.get("/debug/memory/snapshot")
+    def get_memory_snapshot(limit: int = 20):
+        """Top allocation sites, plus growth since the previous snapshot"""
+        try:
+            snapshot = profiler.take_memory_snapshot(limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if snapshot is None:
+            return {"status": "not running"}
+        return snapshot
+
+    @app.get("/debug/threads")
+    def get_threads():
+        """Endpoint to report per-thread CPU usage and queue depths"""
+        return {
+            "threads": profiler.thread_report(),
+            "command_queue": command_queue.qsize(),
+            "connected_clients": len(connected_clients),
+        }
+
 def run_api():
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="error")
 
@@ -0,0 +1,301 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+# Sampling profiler state. Nothing runs until start_cpu_profile() is called,
+# so there is no overhead while profiling is inactive.
+# In "cpu" mode each stack sample is weighted by the CPU time its thread used
+# since the previous tick, so threads blocked in sleeps, locks, audio reads or
+# COM calls contribute nothing. In "wall" mode every thread counts once per tick.
+_sampler_thread = None
+_sampler_stop = threading.Event()
+_samples = Counter()
+_sample_count = 0
+_profile_started = None
+_profile_mode = None
+_cpu_lock = threading.Lock()
+
+# Last tracemalloc snapshot, used as the baseline for diffs
+_last_snapshot = None
+_memory_lock = threading.Lock()
+
+# Allowed range for the sampling interval, in seconds
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 1.0
+
+# tracemalloc only accepts this many frames per traceback
+MAX_TRACE_FRAMES = 65535
+
+PROFILE_MODES = ("cpu", "wall")
+
+# Per-thread CPU time lookup by native thread id
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.OpenThread.restype = wintypes.HANDLE
+    _kernel32.OpenThread.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    _kernel32.GetThreadTimes.argtypes = (wintypes.HANDLE,) + (ctypes.POINTER(ctypes.c_ulonglong),) * 4
+    _kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    THREAD_QUERY_LIMITED_INFORMATION = 0x0800
+
+    def _thread_cpu_time(native_id):
+        """Return user + kernel CPU seconds of a thread, or None if unavailable"""
+        handle = _kernel32.OpenThread(THREAD_QUERY_LIMITED_INFORMATION, False, native_id)
+        if not handle:
+            return None
+        try:
+            creation, exit_, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+            if not _kernel32.GetThreadTimes(handle, ctypes.byref(creation), ctypes.byref(exit_),
+                                            ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            # FILETIME values are in 100 ns units
+            return (kernel.value + user.value) / 1e7
+        finally:
+            _kernel32.CloseHandle(handle)
+
+elif os.path.isdir("/proc/self/task"):
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+    def _thread_cpu_time(native_id):
+        """Return user + kernel CPU seconds of a thread, or None if unavailable"""
+        try:
+            # schedstat reports nanoseconds on CPU; stat only has clock ticks
+            with open(f"/proc/self/task/{native_id}/schedstat") as f:
+                return int(f.read().split()[0]) / 1e9
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            with open(f"/proc/self/task/{native_id}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            # utime and stime are fields 14 and 15, counted from the state field (3)
+            return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+        except (OSError, ValueError, IndexError):
+            return None
+
+else:
+    def _thread_cpu_time(native_id):
+        return None
+
+
+def cpu_time_supported():
+    """Return True if per-thread CPU time can be read on this platform"""
+    return _thread_cpu_time(threading.get_native_id()) is not None
+
+
+def _frame_label(frame):
+    """Format a frame as 'function (file:line)' for collapsed stacks"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _sample_loop(interval, mode):
+    """Periodically record the stack of every thread except the sampler itself"""
+    global _sample_count
+    own_ident = threading.get_ident()
+    last_cpu = {}
+    if mode == "cpu":
+        # Baseline so the first tick doesn't charge each thread's whole lifetime
+        for t in threading.enumerate():
+            if t.native_id is not None:
+                last_cpu[t.ident] = _thread_cpu_time(t.native_id)
+    while not _sampler_stop.wait(interval):
+        threads = {t.ident: t for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            thread = threads.get(ident)
+            if mode == "cpu":
+                if thread is None or thread.native_id is None:
+                    continue
+                cpu = _thread_cpu_time(thread.native_id)
+                previous = last_cpu.get(ident)
+                last_cpu[ident] = cpu
+                if cpu is None or previous is None:
+                    continue
+                # Weight in microseconds of CPU used since the last tick
+                weight = round((cpu - previous) * 1e6)
+                if weight <= 0:
+                    continue
+            else:
+                weight = 1
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread.name if thread is not None else f"thread-{ident}")
+            # Collapsed stacks are root first, separated by semicolons
+            _samples[";".join(reversed(stack))] += weight
+        _sample_count += 1
+
+
+def is_cpu_profiling():
+    """Return True while the sampling profiler is running"""
+    return _sampler_thread is not None and _sampler_thread.is_alive()
+
+
+def start_cpu_profile(interval=0.005, mode="cpu"):
+    """
+    Start sampling the stacks of all threads every `interval` seconds.
+    `mode` is "cpu" (weight samples by per-thread CPU time) or "wall".
+    Returns False if a profile is already running.
+    Raises ValueError for an out-of-range interval, an unknown mode, or
+    "cpu" mode on a platform without per-thread CPU time.
+    """
+    global _sampler_thread, _sample_count, _profile_started, _profile_mode
+    if not MIN_INTERVAL <= interval <= MAX_INTERVAL:
+        raise ValueError(f"interval must be between {MIN_INTERVAL} and {MAX_INTERVAL} seconds")
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+    if mode == "cpu" and not cpu_time_supported():
+        raise ValueError("per-thread CPU time is not available on this platform, use mode=wall")
+    with _cpu_lock:
+        if is_cpu_profiling():
+            return False
+        _samples.clear()
+        _sample_count = 0
+        _profile_mode = mode
+        _profile_started = time.monotonic()
+        _sampler_stop.clear()
+        _sampler_thread = threading.Thread(
+            target=_sample_loop, args=(interval, mode), name="cpu-profiler", daemon=True
+        )
+        _sampler_thread.start()
+        return True
+
+
+def stop_cpu_profile():
+    """
+    Stop the sampling profiler and return the profile in collapsed stack
+    format ('frame;frame;frame count' per line), as consumed by flamegraph.pl,
+    speedscope and inferno. In "cpu" mode counts are microseconds of CPU time,
+    in "wall" mode they are samples. Returns None if no profile was running.
+    """
+    global _sampler_thread
+    with _cpu_lock:
+        if not is_cpu_profiling():
+            return None
+        _sampler_stop.set()
+        _sampler_thread.join()
+        _sampler_thread = None
+        lines = [f"{stack} {count}" for stack, count in _samples.most_common()]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def cpu_profile_status():
+    """Return whether profiling is active and how many samples were taken"""
+    active = is_cpu_profiling()
+    return {
+        "active": active,
+        "mode": _profile_mode if active else None,
+        "samples": _sample_count,
+        "elapsed_seconds": round(time.monotonic() - _profile_started, 3) if active else None,
+    }
+
+
+def start_memory_tracing(frames=1):
+    """
+    Start tracemalloc, keeping `frames` frames per allocation traceback.
+    Raises ValueError if `frames` is outside 1..MAX_TRACE_FRAMES.
+    """
+    global _last_snapshot
+    if not 1 <= frames <= MAX_TRACE_FRAMES:
+        raise ValueError(f"frames must be between 1 and {MAX_TRACE_FRAMES}")
+    with _memory_lock:
+        if tracemalloc.is_tracing():
+            return False
+        _last_snapshot = None
+        tracemalloc.start(frames)
+        return True
+
+
+def stop_memory_tracing():
+    """Stop tracemalloc and drop the stored baseline snapshot"""
+    global _last_snapshot
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            return False
+        _last_snapshot = None
+        tracemalloc.stop()
+        return True
+
+
+def _format_stat(stat):
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "size_diff_kb": round(getattr(stat, "size_diff", 0) / 1024, 1),
+        "count": stat.count,
+        "count_diff": getattr(stat, "count_diff", 0),
+    }
+
+
+def take_memory_snapshot(limit=20):
+    """
+    Take a tracemalloc snapshot and report the top allocation sites.
+    If an earlier snapshot exists, the sites that grew most since then are
+    included under "growth".
+    Returns None if tracing is not active.
+    Raises ValueError if `limit` is less than 1.
+    """
+    global _last_snapshot
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [_format_stat(s) for s in snapshot.statistics("lineno")[:limit]],
+            "growth": None,
+        }
+        if _last_snapshot is not None:
+            # compare_to sorts by absolute size_diff, so growth stays largest first
+            grown = [s for s in snapshot.compare_to(_last_snapshot, "lineno") if s.size_diff > 0]
+            result["growth"] = [_format_stat(s) for s in grown[:limit]]
+        _last_snapshot = snapshot
+        return result
+
+
+def thread_report(window=0.1):
+    """
+    Return name, CPU usage and innermost frame of every Python thread.
+    cpu_percent is measured over `window` seconds; it is None where
+    per-thread CPU time is unavailable.
+    """
+    threads = threading.enumerate()
+    before = {t.ident: _thread_cpu_time(t.native_id) for t in threads if t.native_id is not None}
+    time.sleep(window)
+    frames = sys._current_frames()
+    report = []
+    for t in threads:
+        cpu = _thread_cpu_time(t.native_id) if t.native_id is not None else None
+        start = before.get(t.ident)
+        frame = frames.get(t.ident)
+        report.append({
+            "name": t.name,
+            "ident": t.ident,
+            "native_id": t.native_id,
+            "daemon": t.daemon,
+            "cpu_seconds": round(cpu, 3) if cpu is not None else None,
+            "cpu_percent": (
+                round((cpu - start) / window * 100, 1)
+                if cpu is not None and start is not None else None
+            ),
+            "innermost_frame": (
+                f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+                if frame is not None else None
+            ),
+        })
+    return report
@@ -0,0 +1,139 @@
+import os
+import socket
+import threading
+import time
+import unittest
+
+import profiler
+
+
+def _spin(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        sum(range(1000))
+
+
+class CpuProfileTests(unittest.TestCase):
+    def tearDown(self):
+        profiler.stop_cpu_profile()
+
+    def test_stop_returns_collapsed_stacks(self):
+        self.assertTrue(profiler.start_cpu_profile(0.001))
+        _spin(0.2)
+        folded = profiler.stop_cpu_profile()
+        lines = folded.splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack)
+            self.assertGreater(int(count), 0)
+
+    def test_second_start_returns_false(self):
+        self.assertTrue(profiler.start_cpu_profile())
+        self.assertFalse(profiler.start_cpu_profile())
+
+    def test_stop_when_idle_returns_none(self):
+        self.assertIsNone(profiler.stop_cpu_profile())
+
+    def _profile_with_blocked_threads(self, mode):
+        """Profile a spinning main thread next to threads blocked in Python and C waits"""
+        event = threading.Event()
+        left, right = socket.socketpair()
+        blocked = [
+            threading.Thread(target=event.wait, name="event-waiter", daemon=True),
+            threading.Thread(target=time.sleep, args=(0.4,), name="sleeper", daemon=True),
+            threading.Thread(target=left.recv, args=(1,), name="socket-reader", daemon=True),
+        ]
+        for t in blocked:
+            t.start()
+        try:
+            self.assertTrue(profiler.start_cpu_profile(0.001, mode))
+            _spin(0.3)
+            return profiler.stop_cpu_profile()
+        finally:
+            event.set()
+            right.send(b"x")
+            for t in blocked:
+                t.join()
+            left.close()
+            right.close()
+
+    @unittest.skipUnless(profiler.cpu_time_supported(), "per-thread CPU time unavailable")
+    def test_cpu_mode_skips_blocked_threads(self):
+        folded = self._profile_with_blocked_threads("cpu")
+        self.assertIn("_spin", folded)
+        for name in ("event-waiter", "sleeper", "socket-reader"):
+            self.assertNotIn(name, folded)
+
+    def test_wall_mode_keeps_blocked_threads(self):
+        folded = self._profile_with_blocked_threads("wall")
+        for name in ("event-waiter", "sleeper", "socket-reader"):
+            self.assertIn(name, folded)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            profiler.start_cpu_profile(mode="bogus")
+        self.assertFalse(profiler.is_cpu_profiling())
+
+    def test_interval_out_of_range(self):
+        for interval in (0, -1, profiler.MIN_INTERVAL / 2, profiler.MAX_INTERVAL * 2):
+            with self.assertRaises(ValueError):
+                profiler.start_cpu_profile(interval)
+        self.assertFalse(profiler.is_cpu_profiling())
+
+
+class MemoryTracingTests(unittest.TestCase):
+    def tearDown(self):
+        profiler.stop_memory_tracing()
+
+    def test_snapshot_diff_after_allocation(self):
+        self.assertTrue(profiler.start_memory_tracing())
+        first = profiler.take_memory_snapshot()
+        self.assertIsNone(first["growth"])
+        data = [str(i) for i in range(10000)]
+        second = profiler.take_memory_snapshot()
+        here = [s for s in second["growth"] if os.path.basename(__file__) in s["location"]]
+        self.assertTrue(here)
+        self.assertGreater(here[0]["size_diff_kb"], 0)
+        self.assertGreaterEqual(here[0]["count_diff"], 10000)
+        for stat in second["growth"]:
+            self.assertGreaterEqual(stat["size_diff_kb"], 0)
+        del data
+
+    def test_snapshot_when_not_tracing(self):
+        self.assertIsNone(profiler.take_memory_snapshot())
+
+    def test_frames_out_of_range(self):
+        for frames in (0, -1, profiler.MAX_TRACE_FRAMES + 1):
+            with self.assertRaises(ValueError):
+                profiler.start_memory_tracing(frames)
+
+    def test_limit_out_of_range(self):
+        profiler.start_memory_tracing()
+        for limit in (0, -5):
+            with self.assertRaises(ValueError):
+                profiler.take_memory_snapshot(limit)
+
+
+class ThreadReportTests(unittest.TestCase):
+    @unittest.skipUnless(profiler.cpu_time_supported(), "per-thread CPU time unavailable")
+    def test_cpu_percent_separates_busy_and_blocked(self):
+        spinner = threading.Thread(target=_spin, args=(0.5,), name="spinner", daemon=True)
+        sleeper = threading.Thread(target=time.sleep, args=(0.5,), name="sleeper", daemon=True)
+        spinner.start()
+        sleeper.start()
+        try:
+            report = {t["name"]: t for t in profiler.thread_report(0.2)}
+            self.assertGreater(report["spinner"]["cpu_percent"], 20)
+            self.assertLess(report["sleeper"]["cpu_percent"], 5)
+        finally:
+            spinner.join()
+            sleeper.join()
+
+    def test_reports_innermost_frame(self):
+        report = {t["name"]: t for t in profiler.thread_report(0.01)}
+        self.assertIn("thread_report", report[threading.current_thread().name]["innermost_frame"])
+
+
+if __name__ == "__main__":
+    unittest.main()